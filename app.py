@@ -6,7 +6,7 @@ IRELEC – Système de Gestion de Facturation d'Électricité (MVP)
 import streamlit as st
 import pandas as pd
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
 import tempfile
 import os
 from fpdf import FPDF
@@ -61,9 +61,13 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Configuration base de données
+# Chemin surchargeable via IRELEC_DB (ex: base générée pour les tests de charge)
+DB_PATH = os.environ.get('IRELEC_DB', 'irelec.db')
+
 def init_db():
     """Initialiser la base de données SQLite"""
-    conn = sqlite3.connect('irelec.db')
+    # Délai d'attente long : au premier démarrage, les autres sessions attendent la migration
+    conn = sqlite3.connect(DB_PATH, timeout=60)
     c = conn.cursor()
     
     # Table clients
@@ -90,20 +94,99 @@ def init_db():
                   FOREIGN KEY (client_id) REFERENCES clients (id))''')
     
     conn.commit()
+    
+    # Migration des tarifs datés : init_db tourne à chaque rerun et ne doit pas
+    # prendre de verrou en écriture une fois la base à jour
+    if not schema_tarifs_a_jour(c):
+        conn.isolation_level = None
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            # Nouvelle vérification sous verrou : une autre session a pu migrer entre-temps
+            if not schema_tarifs_a_jour(c):
+                migrer_tarifs(c)
+            c.execute("COMMIT")
+        except sqlite3.Error:
+            c.execute("ROLLBACK")
+            raise
+    
     conn.close()
 
+INDEX_TARIFS = {'idx_tarifs_client_date', 'idx_factures_date', 'idx_factures_origine'}
+
+def schema_tarifs_a_jour(c):
+    """Vérifier que la colonne, la table et les index des tarifs datés existent"""
+    colonnes = [col[1] for col in c.execute("PRAGMA table_info(factures)")]
+    tables = {ligne[0] for ligne in c.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    index = {ligne[0] for ligne in c.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    return 'facture_origine_id' in colonnes and 'tarifs' in tables and INDEX_TARIFS <= index
+
+def migrer_tarifs(c):
+    """Créer les tarifs datés (à exécuter dans une transaction)"""
+    # Factures d'ajustement : référence vers la facture corrigée
+    colonnes = [col[1] for col in c.execute("PRAGMA table_info(factures)")]
+    if 'facture_origine_id' not in colonnes:
+        c.execute("ALTER TABLE factures ADD COLUMN facture_origine_id INTEGER REFERENCES factures (id)")
+    
+    if c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tarifs'").fetchone() is None:
+        # Table tarifs (versions datées du tarif de chaque client)
+        c.execute('''CREATE TABLE tarifs
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      client_id INTEGER NOT NULL,
+                      tarif REAL NOT NULL,
+                      date_effet TIMESTAMP NOT NULL,
+                      date_creation TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                      FOREIGN KEY (client_id) REFERENCES clients (id))''')
+        
+        # Historique reconstitué depuis le tarif copié sur chaque facture :
+        # une version par changement de tarif, datée de la première facture à ce tarif
+        c.execute('''INSERT INTO tarifs (client_id, tarif, date_effet)
+                     WITH historique AS (
+                         SELECT client_id, tarif, date_facture,
+                                LAG(tarif) OVER (PARTITION BY client_id ORDER BY date_facture, id) AS tarif_precedent,
+                                ROW_NUMBER() OVER (PARTITION BY client_id ORDER BY date_facture, id) AS rang
+                         FROM factures
+                         WHERE client_id IS NOT NULL AND tarif IS NOT NULL)
+                     SELECT h.client_id, h.tarif,
+                            CASE WHEN h.rang = 1 THEN MIN(date(c.date_creation), h.date_facture)
+                                 ELSE h.date_facture END
+                     FROM historique h JOIN clients c ON c.id = h.client_id
+                     WHERE h.tarif_precedent IS NULL OR h.tarif_precedent <> h.tarif''')
+        
+        # Tarif actuel du client : depuis sa création s'il n'a jamais été facturé,
+        # sinon à partir de maintenant s'il diffère du dernier tarif facturé
+        c.execute('''INSERT INTO tarifs (client_id, tarif, date_effet)
+                     SELECT c.id, c.tarif,
+                            CASE WHEN EXISTS (SELECT 1 FROM tarifs t WHERE t.client_id = c.id)
+                                 THEN ? ELSE date(c.date_creation) END
+                     FROM clients c
+                     WHERE c.tarif IS NOT (SELECT t.tarif FROM tarifs t WHERE t.client_id = c.id
+                                           ORDER BY t.date_effet DESC, t.id DESC LIMIT 1)''',
+                  (datetime.now().strftime('%Y-%m-%d %H:%M:%S'),))
+    
+    # Index pour la recherche du tarif applicable et la refacturation
+    c.execute("CREATE INDEX IF NOT EXISTS idx_tarifs_client_date ON tarifs (client_id, date_effet)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_factures_date ON factures (date_facture)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_factures_origine ON factures (facture_origine_id, montant_total)")
+
 # Initialiser la base de données
 init_db()
 
 # Fonctions d'aide pour la base de données
 def get_db_connection():
     """Obtenir une connexion à la base de données"""
-    return sqlite3.connect('irelec.db', check_same_thread=False)
+    return sqlite3.connect(DB_PATH, check_same_thread=False)
 
 def get_clients():
-    """Récupérer tous les clients"""
+    """Récupérer tous les clients avec leur tarif en vigueur"""
     conn = get_db_connection()
-    df = pd.read_sql_query("SELECT * FROM clients ORDER BY date_creation DESC", conn)
+    df = pd.read_sql_query("""SELECT c.id, c.nom_complet, c.numero_compteur, c.numero_contrat,
+                                     c.localisation,
+                                     (SELECT t.tarif FROM tarifs t
+                                      WHERE t.client_id = c.id AND t.date_effet <= ?
+                                      ORDER BY t.date_effet DESC, t.id DESC LIMIT 1) AS tarif,
+                                     c.date_creation
+                              FROM clients c ORDER BY c.date_creation DESC""",
+                           conn, params=(datetime.now().strftime('%Y-%m-%d %H:%M:%S'),))
     conn.close()
     return df
 
@@ -118,16 +201,22 @@ def get_factures(client_id=None):
     """Récupérer les factures, optionnellement filtrées par client"""
     conn = get_db_connection()
     if client_id:
-        query = """SELECT f.*, c.nom_complet, c.numero_compteur, c.numero_contrat 
+        query = """SELECT f.*, c.nom_complet, c.numero_compteur, c.numero_contrat,
+                          o.numero_facture AS numero_origine, o.tarif AS tarif_origine,
+                          o.consommation AS consommation_origine
                    FROM factures f 
                    JOIN clients c ON f.client_id = c.id 
+                   LEFT JOIN factures o ON f.facture_origine_id = o.id
                    WHERE f.client_id = ? 
                    ORDER BY f.date_facture DESC"""
         df = pd.read_sql_query(query, conn, params=(client_id,))
     else:
-        query = """SELECT f.*, c.nom_complet, c.numero_compteur, c.numero_contrat 
+        query = """SELECT f.*, c.nom_complet, c.numero_compteur, c.numero_contrat,
+                          o.numero_facture AS numero_origine, o.tarif AS tarif_origine,
+                          o.consommation AS consommation_origine
                    FROM factures f 
                    JOIN clients c ON f.client_id = c.id 
+                   LEFT JOIN factures o ON f.facture_origine_id = o.id
                    ORDER BY f.date_facture DESC"""
         df = pd.read_sql_query(query, conn)
     conn.close()
@@ -142,6 +231,8 @@ def sauvegarder_client(nom_complet, numero_compteur, numero_contrat, localisatio
                      (nom_complet, numero_compteur, numero_contrat, localisation, tarif) 
                      VALUES (?, ?, ?, ?, ?)""",
                   (nom_complet, numero_compteur, numero_contrat, localisation, float(tarif)))
+        c.execute("INSERT INTO tarifs (client_id, tarif, date_effet) VALUES (?, ?, ?)",
+                  (c.lastrowid, float(tarif), datetime.now().strftime('%Y-%m-%d')))
         conn.commit()
         return True
     except sqlite3.IntegrityError:
@@ -154,15 +245,17 @@ def sauvegarder_facture(client_id, index_precedent, index_actuel, tarif):
     consommation = index_actuel - index_precedent
     montant_total = consommation * tarif
     numero_facture = f"FACT-{datetime.now().strftime('%Y%m%d')}-{client_id:04d}"
+    # Heure locale, comme les dates d'effet des tarifs (CURRENT_TIMESTAMP est en UTC)
+    date_facture = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     conn = get_db_connection()
     c = conn.cursor()
     c.execute("""INSERT INTO factures 
                  (client_id, numero_facture, index_precedent, index_actuel, 
-                  consommation, tarif, montant_total) 
-                 VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                  consommation, tarif, montant_total, date_facture) 
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
               (client_id, numero_facture, index_precedent, index_actuel, 
-               consommation, tarif, montant_total))
+               consommation, tarif, montant_total, date_facture))
     conn.commit()
     conn.close()
     
@@ -170,7 +263,131 @@ def sauvegarder_facture(client_id, index_precedent, index_actuel, tarif):
         'numero_facture': numero_facture,
         'consommation': consommation,
         'montant_total': montant_total,
-        'date_facture': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        'date_facture': date_facture
+    }
+
+def get_tarifs(client_id):
+    """Récupérer l'historique des tarifs d'un client"""
+    conn = get_db_connection()
+    df = pd.read_sql_query("""SELECT tarif, date_effet, date_creation FROM tarifs
+                              WHERE client_id = ?
+                              ORDER BY date_effet DESC, id DESC""",
+                           conn, params=(client_id,))
+    conn.close()
+    return df
+
+def get_tarif_en_vigueur(client_id, date=None):
+    """Récupérer le tarif d'un client en vigueur à une date (par défaut maintenant)"""
+    if date is None:
+        date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    conn = get_db_connection()
+    ligne = conn.execute("""SELECT tarif FROM tarifs
+                            WHERE client_id = ? AND date_effet <= ?
+                            ORDER BY date_effet DESC, id DESC LIMIT 1""",
+                         (int(client_id), str(date))).fetchone()
+    conn.close()
+    return ligne[0] if ligne else None
+
+def ajouter_tarif(client_id, tarif, date_effet):
+    """Ajouter une version datée du tarif d'un client"""
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute("INSERT INTO tarifs (client_id, tarif, date_effet) VALUES (?, ?, ?)",
+              (int(client_id), float(tarif), date_effet))
+    conn.commit()
+    conn.close()
+
+def refacturer_periode(date_debut, date_fin):
+    """Recalculer les factures d'une période avec les tarifs en vigueur
+    et enregistrer les ajustements (crédit < 0, débit > 0).
+    
+    En cas d'erreur sur un mois, les mois précédents restent enregistrés :
+    'mois_traites' et les totaux les décrivent, 'erreur' indique le mois en échec."""
+    debut = datetime.strptime(str(date_debut)[:10], '%Y-%m-%d')
+    fin = datetime.strptime(str(date_fin)[:10], '%Y-%m-%d') + timedelta(days=1)
+    resultat = {'nombre_ajustements': 0, 'total_credit': 0.0, 'total_debit': 0.0,
+                'mois_traites': [], 'erreur': None}
+    
+    # Un lot (et une transaction) par mois : les autres écritures ne sont
+    # bloquées que le temps d'un mois de factures, pas de toute la période
+    while debut < fin:
+        mois_suivant = datetime(debut.year + debut.month // 12, debut.month % 12 + 1, 1)
+        borne = min(mois_suivant, fin)
+        try:
+            nombre, credit, debit = _refacturer_lot(debut.strftime('%Y-%m-%d'), borne.strftime('%Y-%m-%d'))
+        except sqlite3.Error as e:
+            resultat['erreur'] = f"{debut.strftime('%Y-%m')}: {str(e)}"
+            break
+        resultat['mois_traites'].append(debut.strftime('%Y-%m'))
+        resultat['nombre_ajustements'] += nombre
+        resultat['total_credit'] += credit
+        resultat['total_debit'] += debit
+        debut = borne
+    
+    return resultat
+
+def _refacturer_lot(date_debut, date_fin):
+    """Refacturer les factures de [date_debut, date_fin[ dans une transaction"""
+    conn = get_db_connection()
+    conn.isolation_level = None
+    c = conn.cursor()
+    try:
+        c.execute("BEGIN IMMEDIATE")
+        dernier_id = c.execute("SELECT COALESCE(MAX(id), 0) FROM factures").fetchone()[0]
+
+        # Une seule requête ensembliste : tarif applicable à la date de chaque facture,
+        # montant déjà facturé (facture + ajustements précédents), écart à régulariser.
+        # L'ajustement ne porte pas de kWh et garde la date de la facture corrigée.
+        # Le "+" force le parcours par idx_factures_date plutôt que par l'origine (NULL partout)
+        c.execute("""INSERT INTO factures
+                     (client_id, numero_facture, consommation, tarif, montant_total,
+                      date_facture, facture_origine_id)
+                     WITH cible AS (
+                         SELECT f.id, f.client_id, f.consommation, f.date_facture,
+                                (SELECT t.tarif FROM tarifs t
+                                 WHERE t.client_id = f.client_id AND t.date_effet <= f.date_facture
+                                 ORDER BY t.date_effet DESC, t.id DESC LIMIT 1) AS tarif,
+                                f.montant_total + COALESCE(
+                                    (SELECT SUM(a.montant_total) FROM factures a
+                                     WHERE a.facture_origine_id = f.id), 0) AS deja_facture,
+                                (SELECT COUNT(*) FROM factures a
+                                 WHERE a.facture_origine_id = f.id) AS nb_ajustements
+                         FROM factures f
+                         WHERE +f.facture_origine_id IS NULL
+                           AND f.date_facture >= ? AND f.date_facture < ?)
+                     SELECT client_id, 'AJUST-' || printf('%06d', id) || '-' || (nb_ajustements + 1),
+                            0, tarif, ROUND(consommation * tarif - deja_facture, 2), date_facture, id
+                     FROM cible
+                     WHERE tarif IS NOT NULL
+                       AND ROUND(consommation * tarif - deja_facture, 2) <> 0""",
+                  (date_debut, date_fin))
+
+        ligne = c.execute(
+            """SELECT COUNT(*),
+                      COALESCE(SUM(CASE WHEN montant_total < 0 THEN montant_total END), 0),
+                      COALESCE(SUM(CASE WHEN montant_total > 0 THEN montant_total END), 0)
+               FROM factures WHERE id > ?""", (dernier_id,)).fetchone()
+        c.execute("COMMIT")
+    except sqlite3.Error:
+        if conn.in_transaction:
+            c.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    return ligne
+
+def details_ajustement(ajustement, tarif, montant_total):
+    """Lignes de détail d'une facture d'ajustement (écran et PDF)"""
+    consommation = ajustement['consommation_origine']
+    return {
+        "Facture Corrigée": ajustement['numero_origine'],
+        "Consommation Facturée": f"{consommation:.2f} kWh",
+        "Tarif d'Origine": f"{ajustement['tarif_origine']:.2f} FCFA/kWh",
+        "Nouveau Tarif": f"{tarif:.2f} FCFA/kWh",
+        "Montant Recalculé": f"{consommation * tarif:.2f} FCFA",
+        "Déjà Facturé": f"{consommation * tarif - montant_total:.2f} FCFA",
+        "Crédit" if montant_total < 0 else "Débit": f"{montant_total:.2f} FCFA"
     }
 
 # Fonction pour générer PDF (CORRIGÉE)
@@ -199,7 +416,8 @@ def generer_pdf(donnees_facture, info_client):
     
     # Titre facture
     pdf.set_font(font_name, 'B', 14)
-    pdf.cell(0, 10, "FACTURE D'ELECTRICITE", align='C')
+    titre = "AJUSTEMENT DE FACTURE" if donnees_facture.get('ajustement') else "FACTURE D'ELECTRICITE"
+    pdf.cell(0, 10, titre, align='C')
     pdf.ln(15)
     
     # Détails facture
@@ -234,14 +452,18 @@ def generer_pdf(donnees_facture, info_client):
     pdf.ln(10)
     pdf.set_font(font_name, '', 12)
     
-    details = [
-        f"Index Précédent: {donnees_facture['index_precedent']:.2f} kWh",
-        f"Index Actuel: {donnees_facture['index_actuel']:.2f} kWh",
-        f"Consommation: {donnees_facture['consommation']:.2f} kWh",
-        f"Tarif: {donnees_facture['tarif']:.2f} FCFA/kWh",
-        "",
-        f"MONTANT TOTAL: {donnees_facture['montant_total']:.2f} FCFA"
-    ]
+    if donnees_facture.get('ajustement'):
+        details = [f"{cle}: {valeur}" for cle, valeur in details_ajustement(
+            donnees_facture['ajustement'], donnees_facture['tarif'], donnees_facture['montant_total']).items()]
+    else:
+        details = [
+            f"Index Précédent: {donnees_facture['index_precedent']:.2f} kWh",
+            f"Index Actuel: {donnees_facture['index_actuel']:.2f} kWh",
+            f"Consommation: {donnees_facture['consommation']:.2f} kWh",
+            f"Tarif: {donnees_facture['tarif']:.2f} FCFA/kWh",
+            "",
+            f"MONTANT TOTAL: {donnees_facture['montant_total']:.2f} FCFA"
+        ]
     
     for detail in details:
         pdf.cell(0, 8, detail, align='L')
@@ -285,7 +507,7 @@ def main():
         st.markdown('<h2 class="section-header">📊 Tableau de Bord</h2>', unsafe_allow_html=True)
         
         # Statistiques
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns(4)
         
         with col1:
             clients_df = get_clients()
@@ -293,9 +515,13 @@ def main():
         
         with col2:
             factures_df = get_factures()
-            st.metric("Total Factures", len(factures_df))
+            # Les ajustements de refacturation ne sont pas des factures supplémentaires
+            st.metric("Total Factures", int(factures_df['facture_origine_id'].isna().sum()))
         
         with col3:
+            st.metric("Ajustements", int(factures_df['facture_origine_id'].notna().sum()))
+        
+        with col4:
             revenu_total = factures_df['montant_total'].sum() if not factures_df.empty else 0
             st.metric("Revenu Total", f"{revenu_total:,.2f} FCFA")
         
@@ -314,7 +540,7 @@ def main():
     elif section == "Gestion Clients":
         st.markdown('<h2 class="section-header">👥 Gestion Clients</h2>', unsafe_allow_html=True)
         
-        tab1, tab2 = st.tabs(["Ajouter Nouveau Client", "Voir Tous les Clients"])
+        tab1, tab2, tab3 = st.tabs(["Ajouter Nouveau Client", "Voir Tous les Clients", "Tarifs & Refacturation"])
         
         with tab1:
             st.markdown("### Ajouter Nouveau Client")
@@ -369,6 +595,63 @@ def main():
                     st.info(f"✅ Client sélectionné: {client_selectionne}")
             else:
                 st.info("Aucun client dans la base de données. Veuillez ajouter un client d'abord.")
+        
+        with tab3:
+            st.markdown("### Historique des Tarifs")
+            clients_df = get_clients()
+            
+            if not clients_df.empty:
+                options_clients = {f"{row['nom_complet']} ({row['numero_compteur']})": row['id'] 
+                                   for _, row in clients_df.iterrows()}
+                label_client = st.selectbox("Client:", options=list(options_clients.keys()),
+                                            key="selection_tarif")
+                client_id = options_clients[label_client]
+                
+                with st.form("formulaire_tarif"):
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        nouveau_tarif = st.number_input("Nouveau Tarif (FCFA/kWh) *", min_value=0.0, value=75.0, step=0.1)
+                    with col2:
+                        date_effet = st.date_input("Date d'Effet *", value=datetime.now())
+                    
+                    if st.form_submit_button("Ajouter Tarif"):
+                        ajouter_tarif(client_id, nouveau_tarif, date_effet.strftime('%Y-%m-%d'))
+                        st.markdown('<div class="success-message">✅ Tarif enregistré!</div>', unsafe_allow_html=True)
+                
+                tarifs_df = get_tarifs(client_id)
+                tarifs_df.columns = ['Tarif (FCFA/kWh)', "Date d'Effet", 'Date Création']
+                st.dataframe(tarifs_df)
+                
+                # Refacturation des périodes passées
+                st.markdown("### Refacturation d'une Période")
+                st.caption("Recalcule les factures de la période avec les tarifs en vigueur à leur date "
+                           "et enregistre les ajustements (crédit ou débit). Le traitement se fait mois par mois : "
+                           "pendant chaque mois, les autres opérateurs ne peuvent pas enregistrer de facture.")
+                
+                with st.form("formulaire_refacturation"):
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        date_debut = st.date_input("Date Début", value=datetime(datetime.now().year, 1, 1))
+                    with col2:
+                        date_fin = st.date_input("Date Fin", value=datetime.now())
+                    
+                    if st.form_submit_button("Lancer la Refacturation"):
+                        if date_debut <= date_fin:
+                            resultat = refacturer_periode(date_debut, date_fin)
+                            bilan = (f"{resultat['nombre_ajustements']} ajustement(s) enregistré(s) — "
+                                     f"Crédit: {resultat['total_credit']:,.2f} FCFA, "
+                                     f"Débit: {resultat['total_debit']:,.2f} FCFA")
+                            if resultat['erreur']:
+                                mois_traites = ", ".join(resultat['mois_traites']) or "aucun"
+                                st.error(f"Erreur lors de la refacturation ({resultat['erreur']}). "
+                                         f"Mois déjà enregistrés: {mois_traites} ({bilan}). "
+                                         "Relancez la refacturation : les mois déjà traités ne seront pas dupliqués.")
+                            else:
+                                st.success(bilan)
+                        else:
+                            st.error("La date de début doit précéder la date de fin!")
+            else:
+                st.info("Aucun client dans la base de données. Veuillez ajouter un client d'abord.")
     
     # CONSOMMATION & FACTURATION
     elif section == "Consommation & Facturation":
@@ -395,7 +678,12 @@ def main():
             client_id = options_clients[label_client_selectionne]
             info_client = get_client_by_id(client_id)
             
-            if info_client is not None:
+            # Tarif en vigueur aujourd'hui (les versions à date d'effet future ne s'appliquent pas encore)
+            tarif = get_tarif_en_vigueur(client_id)
+            
+            if info_client is not None and tarif is None:
+                st.error("Aucun tarif en vigueur pour ce client à cette date!")
+            elif info_client is not None:
                 st.session_state.client_selectionne_id = client_id
                 
                 # Afficher info client
@@ -405,7 +693,7 @@ def main():
                 with col2:
                     st.info(f"**Compteur:** {info_client['numero_compteur']}")
                 with col3:
-                    st.info(f"**Tarif:** {info_client['tarif']} FCFA/kWh")
+                    st.info(f"**Tarif:** {tarif} FCFA/kWh")
                 
                 # Formulaire de facturation
                 st.markdown("### Entrer les Index du Compteur")
@@ -426,7 +714,7 @@ def main():
                 if st.button("Calculer Facture", key="calculer_facture"):
                     if index_actuel > index_precedent:
                         consommation = index_actuel - index_precedent
-                        montant = consommation * info_client['tarif']
+                        montant = consommation * tarif
                         
                         # Sauvegarder dans l'état de session
                         st.session_state.facture_actuelle = {
@@ -434,7 +722,7 @@ def main():
                             'index_precedent': index_precedent,
                             'index_actuel': index_actuel,
                             'consommation': consommation,
-                            'tarif': info_client['tarif'],
+                            'tarif': tarif,
                             'montant_total': montant
                         }
                     else:
@@ -533,7 +821,7 @@ def main():
         else:
             # Extraire ID client
             nom_client = filtre_client.split(" (")[0]
-            client_id = clients_df[clients_df['nom_complet'] == nom_client]['id'].values[0]
+            client_id = int(clients_df[clients_df['nom_complet'] == nom_client]['id'].values[0])
             factures_df = get_factures(client_id)
         
         # Appliquer filtre mois si sélectionné
@@ -549,13 +837,16 @@ def main():
         # Afficher factures
         if not factures_df.empty:
             # Statistiques
-            total_factures = len(factures_df)
+            total_factures = int(factures_df['facture_origine_id'].isna().sum())
+            total_ajustements = len(factures_df) - total_factures
             montant_total = factures_df['montant_total'].sum()
             
-            col1, col2 = st.columns(2)
+            col1, col2, col3 = st.columns(3)
             with col1:
                 st.metric("Nombre de Factures", total_factures)
             with col2:
+                st.metric("Ajustements", total_ajustements)
+            with col3:
                 st.metric("Montant Total", f"{montant_total:,.2f} FCFA")
             
             # Afficher tableau
@@ -582,6 +873,15 @@ def main():
                     'localisation': client_info['localisation']
                 }
                 
+                # Facture d'ajustement : rappel de la facture corrigée
+                ajustement = None
+                if pd.notna(facture['facture_origine_id']):
+                    ajustement = {
+                        'numero_origine': facture['numero_origine'],
+                        'tarif_origine': facture['tarif_origine'],
+                        'consommation_origine': facture['consommation_origine']
+                    }
+                
                 afficher_facture(
                     info_client,
                     facture['index_precedent'],
@@ -590,14 +890,15 @@ def main():
                     facture['tarif'],
                     facture['montant_total'],
                     facture['numero_facture'],
-                    facture['date_facture']
+                    facture['date_facture'],
+                    ajustement
                 )
         else:
             st.info("Aucune facture trouvée avec les filtres sélectionnés.")
 
 def afficher_facture(info_client, index_precedent, index_actuel, consommation, 
-                     tarif, montant_total, numero_facture, date_facture=None):
-    """Afficher facture dans une boîte formatée avec option PDF"""
+                     tarif, montant_total, numero_facture, date_facture=None, ajustement=None):
+    """Afficher facture (ou ajustement) dans une boîte formatée avec option PDF"""
     if date_facture is None:
         date_facture = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
@@ -607,9 +908,9 @@ def afficher_facture(info_client, index_precedent, index_actuel, consommation,
     st.markdown("""
     <div style="text-align: center;">
         <h2 style="color: #1E3A8A;">IRELEC – Système de Facturation d'Électricité</h2>
-        <h3 style="color: #2563EB;">FACTURE D'ÉLECTRICITÉ</h3>
+        <h3 style="color: #2563EB;">%s</h3>
     </div>
-    """, unsafe_allow_html=True)
+    """ % ("AJUSTEMENT DE FACTURE" if ajustement else "FACTURE D'ÉLECTRICITÉ"), unsafe_allow_html=True)
     
     # Détails facture
     col1, col2 = st.columns(2)
@@ -634,13 +935,16 @@ def afficher_facture(info_client, index_precedent, index_actuel, consommation,
     # Détails facturation
     st.markdown("### Détails de Facturation")
     
-    donnees_facturation = {
-        "Index Précédent": f"{index_precedent:.2f} kWh",
-        "Index Actuel": f"{index_actuel:.2f} kWh",
-        "Consommation": f"{consommation:.2f} kWh",
-        "Prix par kWh": f"{tarif:.2f} FCFA",
-        "Montant Total": f"{montant_total:.2f} FCFA"
-    }
+    if ajustement:
+        donnees_facturation = details_ajustement(ajustement, tarif, montant_total)
+    else:
+        donnees_facturation = {
+            "Index Précédent": f"{index_precedent:.2f} kWh",
+            "Index Actuel": f"{index_actuel:.2f} kWh",
+            "Consommation": f"{consommation:.2f} kWh",
+            "Prix par kWh": f"{tarif:.2f} FCFA",
+            "Montant Total": f"{montant_total:.2f} FCFA"
+        }
     
     for cle, valeur in donnees_facturation.items():
         col1, col2 = st.columns([1, 2])
@@ -659,7 +963,8 @@ def afficher_facture(info_client, index_precedent, index_actuel, consommation,
         'index_actuel': index_actuel,
         'consommation': consommation,
         'tarif': tarif,
-        'montant_total': montant_total
+        'montant_total': montant_total,
+        'ajustement': ajustement
     }
     
     # Bouton pour générer PDF
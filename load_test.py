@@ -0,0 +1,256 @@
+# load_test.py
+"""
+IRELEC – Test de charge multi-sessions (hors ligne)
+
+Simule N opérateurs qui utilisent l'application en même temps sur la même
+base SQLite. Chaque session tourne dans son propre processus avec l'AppTest
+de Streamlit et parcourt les 4 sections, facture un client, filtre
+l'historique et génère un PDF.
+
+Utilisation :
+    python load_test.py --sessions 8 --iterations 5
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+SECTIONS = ["Tableau de Bord", "Gestion Clients", "Consommation & Facturation", "Historique Factures"]
+
+
+# Génération de la base de test
+def generer_base(chemin, nb_clients, seed):
+    """Créer une base de test peuplée de clients et de factures 2024"""
+    os.environ['IRELEC_DB'] = chemin
+
+    # L'import de app.py crée le schéma (init_db). Il se fait dans un processus
+    # à part : AppTest dans le processus parent remplacerait __main__ et
+    # empêcherait l'envoi de simuler_session aux processus des sessions
+    schema = subprocess.run([sys.executable, '-c', 'import app'], cwd=os.path.dirname(APP_PATH),
+                            env=dict(os.environ, IRELEC_DB=chemin),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if schema.returncode != 0:
+        raise RuntimeError(f"Échec de la création du schéma (import app):\n{schema.stderr}")
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(chemin)
+    c = conn.cursor()
+
+    clients = [(f"Client {i:04d}", f"COMP-{i:06d}", f"CNT-{i:06d}", "Douala",
+                round(rng.uniform(50, 120), 1))
+               for i in range(1, nb_clients + 1)]
+    c.executemany("""INSERT INTO clients
+                     (nom_complet, numero_compteur, numero_contrat, localisation, tarif)
+                     VALUES (?, ?, ?, ?, ?)""", clients)
+    c.execute("""INSERT INTO tarifs (client_id, tarif, date_effet)
+                 SELECT id, tarif, '2024-01-01' FROM clients""")
+
+    factures = []
+    for client_id, (_, _, _, _, tarif) in enumerate(clients, start=1):
+        index = 0.0
+        for mois in range(1, 13):
+            consommation = round(rng.uniform(50, 400), 2)
+            factures.append((client_id, f"FACT-2024{mois:02d}01-{client_id:04d}",
+                             index, index + consommation, consommation, tarif,
+                             consommation * tarif, f"2024-{mois:02d}-01 10:00:00"))
+            index += consommation
+    c.executemany("""INSERT INTO factures
+                     (client_id, numero_facture, index_precedent, index_actuel,
+                      consommation, tarif, montant_total, date_facture)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", factures)
+
+    conn.commit()
+    conn.close()
+    return clients
+
+
+# Simulation d'une session opérateur
+def _widget_par_label(widgets, label):
+    """Trouver un widget par son libellé"""
+    return next(w for w in widgets if w.label == label)
+
+
+def _executer(at, action, mesures, erreurs, timeout):
+    """Relancer le script, chronométrer et classer les erreurs affichées"""
+    debut = time.perf_counter()
+    try:
+        at.run(timeout=timeout)
+    except RuntimeError:
+        erreurs['timeout'] += 1
+        return False
+    except KeyError:
+        # AppTest 1.28 lit l'événement SHUTDOWN du script avant qu'il soit
+        # enregistré (course interne) ; l'arbre des éléments est déjà à jour
+        pass
+    finally:
+        mesures.append((action, time.perf_counter() - debut))
+
+    messages = [e.value for e in at.error] + [e.value for e in at.exception]
+    for message in messages:
+        if 'locked' in str(message) or 'busy' in str(message):
+            erreurs['verrou'] += 1
+        elif 'UNIQUE' in str(message):
+            erreurs['integrite'] += 1
+        else:
+            erreurs['autre'] += 1
+    return not messages
+
+
+def simuler_session(numero, iterations, clients, timeout, barriere):
+    """Parcourir l'application comme un opérateur pendant N itérations"""
+    rng = random.Random(numero)
+    mesures = []
+    erreurs = Counter()
+    compteurs = Counter()
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    barriere.wait()
+    debut = time.time()
+    _executer(at, 'demarrage', mesures, erreurs, timeout)
+
+    for iteration in range(iterations):
+        # Navigation dans les 4 sections
+        for section in SECTIONS:
+            at.sidebar.radio[0].set_value(section)
+            _executer(at, 'navigation', mesures, erreurs, timeout)
+
+        # Facturation : un client distinct par session et par itération
+        # (le numéro de facture est unique par client et par jour)
+        at.sidebar.radio[0].set_value("Consommation & Facturation")
+        _executer(at, 'navigation', mesures, erreurs, timeout)
+        nom, compteur, _, _, _ = clients[(numero * iterations + iteration) % len(clients)]
+        at.selectbox(key="selection_facturation").set_value(f"{nom} (Compteur: {compteur})")
+        _executer(at, 'selection_client', mesures, erreurs, timeout)
+        at.number_input(key="index_precedent").set_value(1000.0)
+        at.number_input(key="index_actuel").set_value(1000.0 + rng.randint(50, 400))
+        at.button(key="calculer_facture").click()
+        _executer(at, 'calcul_facture', mesures, erreurs, timeout)
+        at.button(key="generer_facture").click()
+        if _executer(at, 'generation_facture', mesures, erreurs, timeout):
+            compteurs['factures'] += 1
+
+        # Historique : filtre client puis mois
+        at.sidebar.radio[0].set_value("Historique Factures")
+        _executer(at, 'navigation', mesures, erreurs, timeout)
+        filtre_client = _widget_par_label(at.selectbox, "Filtrer par Client:")
+        filtre_client.set_value(f"{nom} ({compteur})")
+        _executer(at, 'filtre_historique', mesures, erreurs, timeout)
+        filtre_mois = _widget_par_label(at.selectbox, "Filtrer par Mois:")
+        filtre_mois.set_value(filtre_mois.options[rng.randint(1, 12)])
+        _executer(at, 'filtre_historique', mesures, erreurs, timeout)
+
+        # PDF de la facture affichée
+        boutons_pdf = [b for b in at.button if b.key and b.key.startswith("pdf_")]
+        if boutons_pdf:
+            boutons_pdf[0].click()
+            if _executer(at, 'generation_pdf', mesures, erreurs, timeout):
+                compteurs['pdfs'] += 1
+
+    return {'mesures': mesures, 'erreurs': dict(erreurs), 'compteurs': dict(compteurs),
+            'debut': debut, 'fin': time.time()}
+
+
+# Rapport
+def percentile(valeurs, p):
+    """Percentile par rang le plus proche"""
+    if not valeurs:
+        return 0.0
+    valeurs = sorted(valeurs)
+    rang = max(0, math.ceil(p / 100 * len(valeurs)) - 1)
+    return valeurs[rang]
+
+
+def construire_rapport(resultats):
+    """Agréger les mesures de toutes les sessions"""
+    # Fenêtre de charge : du départ synchronisé à la fin de la dernière session
+    duree = max(r['fin'] for r in resultats) - min(r['debut'] for r in resultats)
+    par_action = {}
+    erreurs = Counter()
+    compteurs = Counter()
+    for resultat in resultats:
+        for action, latence in resultat['mesures']:
+            par_action.setdefault(action, []).append(latence)
+        erreurs.update(resultat['erreurs'])
+        compteurs.update(resultat['compteurs'])
+
+    toutes = [l for latences in par_action.values() for l in latences]
+    latences = {'global': toutes, **par_action}
+    return {
+        'duree_s': duree,
+        'reruns': len(toutes),
+        'reruns_par_s': len(toutes) / duree if duree else 0.0,
+        'factures_par_s': compteurs['factures'] / duree if duree else 0.0,
+        'compteurs': dict(compteurs),
+        'erreurs': dict(erreurs),
+        'latences_ms': {
+            action: dict({f"p{p}": percentile(valeurs, p) * 1000 for p in (50, 90, 95, 99)},
+                         max=max(valeurs) * 1000, n=len(valeurs))
+            for action, valeurs in latences.items()
+        },
+    }
+
+
+def afficher_rapport(rapport):
+    """Afficher le rapport dans le terminal"""
+    print(f"Durée: {rapport['duree_s']:.2f} s")
+    print(f"Reruns: {rapport['reruns']} ({rapport['reruns_par_s']:.2f}/s)")
+    print(f"Factures: {rapport['compteurs'].get('factures', 0)} ({rapport['factures_par_s']:.2f}/s)")
+    print(f"PDFs: {rapport['compteurs'].get('pdfs', 0)}")
+    print(f"Erreurs de verrou: {rapport['erreurs'].get('verrou', 0)}")
+    print(f"Erreurs d'intégrité: {rapport['erreurs'].get('integrite', 0)}")
+    print(f"Timeouts: {rapport['erreurs'].get('timeout', 0)}")
+    print(f"Autres erreurs: {rapport['erreurs'].get('autre', 0)}")
+    print()
+    print(f"{'Action':<20}{'n':>6}{'p50':>10}{'p90':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for action, stats in rapport['latences_ms'].items():
+        print(f"{action:<20}{stats['n']:>6}{stats['p50']:>10.1f}{stats['p90']:>10.1f}"
+              f"{stats['p95']:>10.1f}{stats['p99']:>10.1f}{stats['max']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge multi-sessions IRELEC")
+    parser.add_argument("--sessions", type=int, default=4, help="Nombre de sessions simultanées")
+    parser.add_argument("--iterations", type=int, default=3, help="Parcours complets par session")
+    parser.add_argument("--clients", type=int, default=200, help="Clients dans la base générée")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout d'un rerun (s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Écrire le rapport JSON dans ce fichier")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = os.path.join(dossier, 'irelec_charge.db')
+        clients = generer_base(chemin, args.clients, args.seed)
+
+        # Processus séparés : chaque session a ses propres connexions SQLite,
+        # comme des navigateurs distincts sur un même serveur
+        contexte = multiprocessing.get_context("spawn")
+        with contexte.Manager() as manager:
+            barriere = manager.Barrier(args.sessions)
+            with ProcessPoolExecutor(max_workers=args.sessions, mp_context=contexte) as executeur:
+                futures = [executeur.submit(simuler_session, i, args.iterations, clients,
+                                            args.timeout, barriere)
+                           for i in range(args.sessions)]
+                resultats = [f.result() for f in futures]
+
+    rapport = construire_rapport(resultats)
+    afficher_rapport(rapport)
+    if args.json:
+        with open(args.json, 'w') as fichier:
+            json.dump(rapport, fichier, indent=2)
+
+
+if __name__ == "__main__":
+    main()